@@ -0,0 +1,256 @@
+# backend/archive.py
+# Hot/cold tiering for viral_posts.
+# Posts newer than HOT_WINDOW_DAYS stay in MongoDB (the "hot" tier).
+# Older posts are rolled into gzip'd columnar files on disk, one file per UTC day:
+#   $ARCHIVE_DIR/2025-01-31.json.gz        ->  {"content": [...], "likes": [...], ...}
+#   $ARCHIVE_DIR/2025-01-31.sessions.json  ->  {"count": N, "hours": {"2025-01-31 09:00": {...}}}
+# The small .sessions.json manifest lets /sessions and the dashboard skip the big files.
+# Day and hour keys are UTC so the worker and API nodes agree whatever their time zone;
+# /sessions converts hours to local labels for display.
+
+import os
+import json
+import gzip
+import datetime
+import time
+from dotenv import load_dotenv
+from database import viral_collection
+from logger import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+HOT_WINDOW_DAYS = float(os.getenv("HOT_WINDOW_DAYS", "30"))
+# Must be storage shared by the scraper worker and every API replica (see worker.py).
+# Unset -> nothing is archived and everything stays in Mongo.
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR")
+
+# Columns we keep in the cold tier (everything the frontend / prompts need)
+COLUMNS = ["_id", "content", "likes", "source", "timestamp"]
+
+# Bump when the manifest layout changes so old ones get rebuilt
+MANIFEST_VERSION = 2
+DELETE_BATCH_SIZE = 1000
+
+
+def hot_cutoff():
+    """Timestamp before which posts live in the archive instead of Mongo."""
+    return time.time() - HOT_WINDOW_DAYS * 86400
+
+
+def _utc(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+
+
+def _day_key(ts):
+    return _utc(ts).strftime("%Y-%m-%d")
+
+
+def _hour_key(ts):
+    return _utc(ts).strftime("%Y-%m-%d %H:00")
+
+
+def _day_start(ts):
+    return _utc(ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def _partition_path(day):
+    return os.path.join(ARCHIVE_DIR, f"{day}.json.gz")
+
+
+def _manifest_path(day):
+    return os.path.join(ARCHIVE_DIR, f"{day}.sessions.json")
+
+
+def _archived_days():
+    if not ARCHIVE_DIR or not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(name[: -len(".json.gz")] for name in os.listdir(ARCHIVE_DIR) if name.endswith(".json.gz"))
+
+
+# --- LOW LEVEL: READ / WRITE ONE DAY PARTITION ---
+def _read_partition(day):
+    path = _partition_path(day)
+    if not os.path.exists(path):
+        return {col: [] for col in COLUMNS}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_partition(day, columns):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = _partition_path(day)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(columns, f)
+    # Atomic swap so a crash never leaves a half-written partition behind
+    os.replace(tmp_path, path)
+
+
+# --- SESSION MANIFEST (per-hour aggregates of one day partition) ---
+def _build_manifest(columns):
+    hours = {}
+    for ts, likes in zip(columns["timestamp"], columns["likes"]):
+        hour = hours.setdefault(_hour_key(ts), {"count": 0, "likes": 0, "timestamp": ts})
+        hour["count"] += 1
+        hour["likes"] += likes
+        hour["timestamp"] = min(hour["timestamp"], ts)
+    return {"version": MANIFEST_VERSION, "count": len(columns["timestamp"]), "hours": hours}
+
+
+def _write_manifest(day, manifest):
+    path = _manifest_path(day)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(day):
+    path = _manifest_path(day)
+    # Rebuild if missing or older than its partition (e.g. archived before manifests existed)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(_partition_path(day)):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    manifest = _build_manifest(_read_partition(day))
+    _write_manifest(day, manifest)
+    return manifest
+
+
+def _rows(columns, start=None, end=None, fields=None):
+    fields = fields or COLUMNS
+    for i, ts in enumerate(columns.get("timestamp", [])):
+        if start is not None and ts < start:
+            continue
+        if end is not None and ts > end:
+            continue
+        yield {col: columns[col][i] for col in fields if col in columns}
+
+
+# --- ARCHIVER (Mongo -> Disk) ---
+def _archive_day(day_start, day_end):
+    """Moves one UTC day [day_start, day_end) of cold posts into its partition."""
+    day = _day_key(day_start)
+    query = {"timestamp": {"$gte": day_start, "$lt": day_end}}
+    docs = list(viral_collection.find(query, {col: 1 for col in COLUMNS}))
+    if not docs:
+        return 0
+
+    columns = _read_partition(day)
+    known_ids = set(columns["_id"])
+    for doc in docs:
+        if str(doc["_id"]) in known_ids:
+            continue
+        columns["_id"].append(str(doc["_id"]))
+        columns["content"].append(doc.get("content", ""))
+        columns["likes"].append(doc.get("likes", 0))
+        columns["source"].append(doc.get("source", ""))
+        columns["timestamp"].append(doc.get("timestamp", 0))
+    _write_partition(day, columns)
+    _write_manifest(day, _build_manifest(columns))
+
+    # Only drop from Mongo once the partition is safely on disk
+    ids = [doc["_id"] for doc in docs]
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        viral_collection.delete_many({"_id": {"$in": ids[i : i + DELETE_BATCH_SIZE]}})
+    return len(docs)
+
+
+def archive_cold_posts():
+    """Moves posts older than the hot window out of Mongo, one UTC day at a time."""
+    if viral_collection is None:
+        log.warning("Database disconnected, cannot archive")
+        return 0
+    if not ARCHIVE_DIR:
+        # Writing to a node-local default would hide these posts from other replicas
+        log.info("ARCHIVE_DIR not set, skipping archive")
+        return 0
+
+    cutoff = hot_cutoff()
+    archived = 0
+    day_start = None
+    while True:
+        # Jump straight to the next day that still has cold posts (uses the timestamp index)
+        query = {"timestamp": {"$lt": cutoff}}
+        if day_start is not None:
+            query["timestamp"]["$gte"] = day_end
+        oldest = viral_collection.find_one(query, {"timestamp": 1}, sort=[("timestamp", 1)])
+        if oldest is None:
+            break
+
+        day_start = _day_start(oldest["timestamp"])
+        # The cutoff day is only archived up to the cutoff; the rest stays hot
+        day_end = min(day_start + 86400, cutoff)
+        try:
+            archived += _archive_day(day_start, day_end)
+        except Exception as e:
+            log.error("Archive failed", extra={"day": _day_key(day_start), "error": str(e)})
+
+    if archived:
+        log.info("Archived cold posts", extra={"count": archived, "dir": ARCHIVE_DIR})
+    return archived
+
+
+# --- READER (Disk -> API) ---
+def iter_archived_posts(start=None, end=None, fields=None):
+    """Yields archived posts with start <= timestamp <= end, reading only the needed days."""
+    first_day = _day_key(start) if start is not None else None
+    last_day = _day_key(end) if end is not None else None
+
+    for day in _archived_days():
+        if first_day and day < first_day:
+            continue
+        if last_day and day > last_day:
+            continue
+
+        try:
+            columns = _read_partition(day)
+        except Exception as e:
+            log.error("Could not read archive partition", extra={"day": day, "error": str(e)})
+            continue
+
+        yield from _rows(columns, start, end, fields)
+
+
+def find_archived_posts(start, end, limit=None, fields=None):
+    """Archived posts in a time window, highest likes first."""
+    wanted = list(fields or COLUMNS)
+    # likes is needed for sorting
+    if "likes" not in wanted:
+        wanted.append("likes")
+
+    posts = list(iter_archived_posts(start, end, wanted))
+    posts.sort(key=lambda p: p.get("likes", 0), reverse=True)
+    if limit:
+        posts = posts[:limit]
+    return posts
+
+
+def archived_post_count():
+    """Total posts in the cold tier (reads manifests only)."""
+    total = 0
+    for day in _archived_days():
+        try:
+            total += _read_manifest(day)["count"]
+        except Exception as e:
+            log.error("Could not read archive manifest", extra={"day": day, "error": str(e)})
+    return total
+
+
+def archived_sessions():
+    """Per-UTC-hour {count, likes, timestamp} for the cold tier (reads manifests only)."""
+    sessions = {}
+    for day in _archived_days():
+        try:
+            hours = _read_manifest(day)["hours"]
+        except Exception as e:
+            log.error("Could not read archive manifest", extra={"day": day, "error": str(e)})
+            continue
+        for key, hour in hours.items():
+            merged = sessions.setdefault(key, {"count": 0, "likes": 0, "timestamp": hour["timestamp"]})
+            merged["count"] += hour["count"]
+            merged["likes"] += hour["likes"]
+            merged["timestamp"] = min(merged["timestamp"], hour["timestamp"])
+    return sessions
@@ -4,6 +4,10 @@ import certifi
 from dotenv import load_dotenv
 import datetime
 import time
+from metrics import MongoCommandTimer, SCRAPER_POSTS_SAVED
+from logger import get_logger
+
+log = get_logger(__name__)
 
 load_dotenv()
 
@@ -16,25 +20,28 @@ history_collection = None
 
 # --- CONNECT TO CLOUD DATABASE (Standard & Secure) ---
 try:
-    print(f"🔌 Connecting to MongoDB Atlas...")
+    log.info("Connecting to MongoDB Atlas")
     
     # We use the standard secure method now because your environment is fixed!
-    client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
+    client = MongoClient(MONGO_URI, tlsCAFile=certifi.where(), event_listeners=[MongoCommandTimer()])
     client.admin.command('ping')
     
     db = client["scraping"]
     viral_collection = db["viral_posts"]
     history_collection = db["generated_history"]
-    print("✅ MongoDB Atlas Connected Successfully!")
+    log.info("MongoDB Atlas connected")
+
+    # Session lookups filter on a timestamp window and sort by likes
+    viral_collection.create_index([("timestamp", 1), ("likes", -1)])
 
 except Exception as e:
-    print(f"❌ Connection Failed: {e}")
+    log.error("MongoDB connection failed", extra={"error": str(e)})
     # We don't need a fallback anymore because we know it works!
 
 # --- SAVE FUNCTION (Crucial for Scraper) ---
 def save_scraped_posts_to_db(posts):
     if viral_collection is None:
-        print("⚠️ Database Disconnected. Cannot save.")
+        log.warning("Database disconnected, cannot save scraped posts")
         return
 
     if not posts: return
@@ -53,7 +60,8 @@ def save_scraped_posts_to_db(posts):
                 viral_collection.insert_one(post)
                 new_count += 1
                 
-        print(f"💾 Saved {new_count} new posts to Atlas Cloud DB.")
+        SCRAPER_POSTS_SAVED.inc(new_count)
+        log.info("Saved scraped posts", extra={"new": new_count, "received": len(posts)})
         
     except Exception as e:
-        print(f"❌ Error Saving: {e}")
\ No newline at end of file
+        log.error("Saving scraped posts failed", extra={"error": str(e)})
\ No newline at end of file
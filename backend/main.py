@@ -1,7 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from routers import generator, analytics 
 from routers import history
+import metrics
 
 app = FastAPI()
 
@@ -13,10 +14,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms (exposed on /metrics)
+app.middleware("http")(metrics.track_request_latency)
+
 app.include_router(generator.router)
 app.include_router(analytics.router)
 app.include_router(history.router)
 
 @app.get("/")
 def read_root():
-    return {"status": "scraper AI Engine Online 🟢"}
\ No newline at end of file
+    return {"status": "scraper AI Engine Online 🟢"}
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = metrics.render_metrics()
+    return Response(content=body, media_type=content_type)
\ No newline at end of file
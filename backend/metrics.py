@@ -0,0 +1,114 @@
+# backend/metrics.py
+# Prometheus metrics + per-stage timing.
+# - track_request_latency: HTTP middleware, latency per route template
+# - MongoCommandTimer:     pymongo listener, latency per collection/command
+# - timed():               decorator for pipeline stages (Gemini, SDXL, history save...)
+# Everything is exposed as Prometheus text on GET /metrics (see main.py).
+
+import functools
+import os
+import time
+from prometheus_client import Counter, Histogram, CollectorRegistry, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from pymongo import monitoring
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# --- METRIC DEFINITIONS ---
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+
+MONGO_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command", "outcome"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of individual pipeline stages",
+    ["stage", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+
+SCRAPER_RUNS = Counter("scraper_runs_total", "Scraper harvest runs by final status", ["status"])
+SCRAPER_POSTS_SCRAPED = Counter("scraper_posts_scraped_total", "Posts extracted from the feed")
+SCRAPER_POSTS_SAVED = Counter("scraper_posts_saved_total", "New posts written to viral_posts")
+SCRAPER_REFRESHES = Counter("scraper_feed_refreshes_total", "Feed reloads after scrolling got stuck")
+
+
+# --- HTTP MIDDLEWARE ---
+async def track_request_latency(request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Use the route template (/history/{post_id}) so labels stay low-cardinality
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_LATENCY.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
+
+# --- MONGO COMMAND LISTENER ---
+class MongoCommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        # For CRUD commands the collection name is the value of the command key;
+        # getMore carries the cursor id there and the collection separately
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        else:
+            target = event.command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else "-"
+
+    def _record(self, event, outcome):
+        collection = self._collections.pop(event.request_id, "-")
+        MONGO_LATENCY.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+        log.warning("Mongo command failed", extra={"command": event.command_name, "failure": str(event.failure)})
+
+
+# --- STAGE TIMING ---
+def timed(stage):
+    """Decorator recording how long `stage` takes, labelled ok/error."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                STAGE_LATENCY.labels(stage, outcome).observe(elapsed)
+                log.debug("Stage finished", extra={"stage": stage, "outcome": outcome, "seconds": round(elapsed, 4)})
+        return wrapper
+    return decorator
+
+
+def render_metrics():
+    """Prometheus text exposition: (body, content_type)."""
+    # With uvicorn --workers N each process keeps its own counters;
+    # PROMETHEUS_MULTIPROC_DIR lets /metrics aggregate all of them.
+    # (The scraper worker serves its own endpoint, see worker.py.)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Query
 from database import viral_collection, history_collection
 from scraper import start_feed_harvest
+from archive import hot_cutoff, find_archived_posts, archived_post_count, archived_sessions
 from pydantic import BaseModel
 import scraper_state
+from logger import get_logger
 import datetime
 import time
 
 router = APIRouter()
+log = get_logger(__name__)
 
 # ==========================================
 # 📊 DASHBOARD ANALYTICS (Real Stats)
@@ -21,7 +24,7 @@ async def get_dashboard_stats():
     }
 
     if viral_collection is not None:
-        stats["total_scraped"] = viral_collection.count_documents({})
+        stats["total_scraped"] = viral_collection.count_documents({}) + archived_post_count()
     
     if history_collection is not None:
         stats["total_generated"] = history_collection.count_documents({})
@@ -65,15 +68,26 @@ def get_harvest_sessions():
         
         sessions[key]["count"] += 1
         sessions[key]["avg_likes"] += doc.get("likes", 0)
+
+    # Archived days: pre-aggregated per UTC hour at archive time, shown in local time
+    for hour in archived_sessions().values():
+        key = datetime.datetime.fromtimestamp(hour["timestamp"]).strftime("%Y-%m-%d %H:00")
+        if key not in sessions:
+            sessions[key] = {"label": key, "count": 0, "avg_likes": 0, "timestamp": hour["timestamp"]}
+        sessions[key]["count"] += hour["count"]
+        sessions[key]["avg_likes"] += hour["likes"]
     
     # Sort by newest first
     result = list(sessions.values())
     result.sort(key=lambda x: x["label"], reverse=True)
     return result
 
+# Only what the Viral Database view renders
+SESSION_POST_FIELDS = {"content": 1, "likes": 1, "source": 1, "timestamp": 1}
+
 @router.get("/posts-by-session")
-def get_posts_by_session(timestamp: float):
-    """Fetches posts from a specific time window."""
+def get_posts_by_session(timestamp: float, limit: int = Query(50, ge=1, le=500)):
+    """Fetches the top posts from a specific time window."""
     if viral_collection is None: return []
     
     # 30 mins before to 60 mins after
@@ -81,24 +95,41 @@ def get_posts_by_session(timestamp: float):
     end = timestamp + 3600
     
     query = {"timestamp": {"$gte": start, "$lte": end}}
-    posts = list(viral_collection.find(query).sort("likes", -1))
+    posts = list(viral_collection.find(query, SESSION_POST_FIELDS).sort("likes", -1).limit(limit))
     
     for post in posts: 
         post['_id'] = str(post['_id'])
+
+    # Older sessions have been rolled out of Mongo into the archive
+    if start < hot_cutoff():
+        posts += find_archived_posts(start, end, limit, ["_id"] + list(SESSION_POST_FIELDS))
+        posts.sort(key=lambda p: p.get("likes", 0), reverse=True)
+        posts = posts[:limit]
         
     return posts
 
 @router.post("/trigger-scrape")
 def trigger_scrape(background_tasks: BackgroundTasks):
     """Manually starts the scraper from the Frontend."""
-    print("🚀 Triggering Scraper...")
-    background_tasks.add_task(start_feed_harvest)
-    return {"status": "started"}
+    # Claim the QUEUED slot first so concurrent clicks / API workers can't double-queue
+    if not scraper_state.try_queue("⏳ Queued. Waiting for a scraper worker..."):
+        return {"status": "already_running"}
+
+    if not scraper_state.backend.shared:
+        # Single-process mode: run inside this API worker like before
+        log.info("Triggering scraper in-process")
+        background_tasks.add_task(start_feed_harvest)
+        return {"status": "started"}
+
+    # Shared mode: hand the job to the scraper worker (see worker.py)
+    job_id = scraper_state.backend.enqueue_job({"kind": "feed_harvest"})
+    log.info("Queued scraper job", extra={"job_id": job_id})
+    return {"status": "started", "job_id": job_id}
 
 @router.get("/scraper-status")
 def get_scraper_status():
     """Frontend calls this every 1s to update the popup."""
-    return scraper_state.state
+    return scraper_state.get_state()
 
 class OTPRequest(BaseModel):
     otp: str
@@ -106,6 +137,6 @@ class OTPRequest(BaseModel):
 @router.post("/submit-otp")
 def submit_otp(data: OTPRequest):
     """Frontend sends the OTP here."""
-    print(f"📩 Received OTP from Frontend: {data.otp}")
-    scraper_state.state["otp_input"] = data.otp
+    log.info("Received OTP from frontend")
+    scraper_state.submit_otp(data.otp)
     return {"status": "received"}
\ No newline at end of file
@@ -1,14 +1,17 @@
 from fastapi import APIRouter
 from models import PostRequest
 from database import viral_collection
+from archive import hot_cutoff, find_archived_posts
 # Import the save function
 from services.ai_engine import generate_post_content, save_to_history 
 from prompts import get_trend_prompt, get_remix_prompt
 import base64
 import io
 from PIL import Image
+from logger import get_logger
 
 router = APIRouter()
+log = get_logger(__name__)
 
 @router.post("/generate")
 def generate_viral_post(request: PostRequest):
@@ -23,9 +26,14 @@ def generate_viral_post(request: PostRequest):
             start_time = request.session_timestamp - 1800
             end_time = request.session_timestamp + 3600
             query = {"timestamp": {"$gte": start_time, "$lte": end_time}}
-            context_posts = list(viral_collection.find(query).sort("likes", -1).limit(10))
+            context_posts = list(viral_collection.find(query, {"content": 1, "likes": 1}).sort("likes", -1).limit(10))
+            # Windows crossing the hot cutoff: take the best of both tiers
+            if start_time < hot_cutoff():
+                context_posts += find_archived_posts(start_time, end_time, 10, ["content"])
+                context_posts.sort(key=lambda p: p.get("likes", 0), reverse=True)
+                context_posts = context_posts[:10]
         else:
-            context_posts = list(viral_collection.find().sort("likes", -1).limit(3))
+            context_posts = list(viral_collection.find({}, {"content": 1}).sort("likes", -1).limit(3))
 
         context_str = "\n".join([f"- {p['content'][:300]}..." for p in context_posts])
         topic_instruction = f"Write about: '{request.topic}'." if request.topic else "Detect viral topic."
@@ -44,7 +52,7 @@ def generate_viral_post(request: PostRequest):
                 img_pil = Image.open(io.BytesIO(image_bytes))
                 gemini_inputs.append(img_pil) 
             except Exception as e:
-                print(f"⚠️ Image processing failed: {e}")
+                log.warning("Reference image processing failed", extra={"error": str(e)})
 
         # 2. Get Prompt
         prompt_text = get_remix_prompt(request.reference_caption, request.topic, request.tone)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from database import history_collection
 from bson import ObjectId
-import logging
+from logger import get_logger
 
 # Create the router
 router = APIRouter()
+log = get_logger(__name__)
 
 # --- 1. GET ALL HISTORY ---
 @router.get("/history")
@@ -23,7 +24,7 @@ def get_history():
             
         return posts
     except Exception as e:
-        print(f"Error fetching history: {e}")
+        log.error("Fetching history failed", extra={"error": str(e)})
         return []
 
 # --- 2. DELETE A POST ---
@@ -46,5 +47,5 @@ def delete_post(post_id: str):
             raise HTTPException(status_code=404, detail="Post not found")
             
     except Exception as e:
-        print(f"Error deleting post: {e}")
+        log.error("Deleting post failed", extra={"id": post_id, "error": str(e)})
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -9,14 +9,24 @@ from webdriver_manager.chrome import ChromeDriverManager
 import time
 import random
 import os
+import uuid
 from dotenv import load_dotenv
 from database import save_scraped_posts_to_db
+from archive import archive_cold_posts
 import scraper_state
+from state_backend import LOCK_TTL_SECONDS
+from metrics import SCRAPER_RUNS, SCRAPER_POSTS_SCRAPED, SCRAPER_REFRESHES
+from logger import get_logger
 
 load_dotenv()
+log = get_logger(__name__)
 
-# --- LOGIN FUNCTION (Unchanged) ---
-def login_to_linkedin(driver):
+# Only one harvest per LinkedIn account may run across the whole cluster
+def harvest_lock_name():
+    return f"harvest:{os.getenv('LINKEDIN_EMAIL', 'default')}"
+
+# --- LOGIN FUNCTION ---
+def login_to_linkedin(driver, keep_lock):
     scraper_state.set_status("RUNNING", "🔑 Attempting Login...")
     driver.get("https://www.linkedin.com/login")
     
@@ -38,15 +48,18 @@ def login_to_linkedin(driver):
             WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.ID, "input__email_verification_pin")))
             scraper_state.set_status("WAITING_FOR_OTP", "LinkedIn asked for OTP. Please enter it.")
             
-            while scraper_state.state["otp_input"] is None:
+            # The OTP may arrive through any API worker, so poll the shared state
+            otp_code = scraper_state.take_otp()
+            while otp_code is None:
                 time.sleep(1)
                 try: driver.title 
                 except: return False
+                # The user may take a while to type it; don't let the lock expire meanwhile
+                if not keep_lock(): return False
+                otp_code = scraper_state.take_otp()
             
-            otp_code = scraper_state.state["otp_input"]
             driver.find_element(By.ID, "input__email_verification_pin").send_keys(otp_code)
             driver.find_element(By.ID, "email-pin-submit-button").click()
-            scraper_state.state["otp_input"] = None 
             
         except TimeoutException:
             scraper_state.set_status("RUNNING", "✅ No OTP asked.")
@@ -64,9 +77,30 @@ def login_to_linkedin(driver):
 
 # --- MAIN HARVEST FUNCTION (The "Button-Up" Strategy) ---
 def start_feed_harvest(headless_mode=False):
+    lock_name = harvest_lock_name()
+    lock_owner = uuid.uuid4().hex
+    if not scraper_state.backend.acquire_lock(lock_name, lock_owner, LOCK_TTL_SECONDS):
+        log.warning("Harvest already running for this account, skipping", extra={"lock": lock_name})
+        return False
+
+    def keep_lock():
+        """Refreshes the lock + heartbeat; False (and ERROR status) if we lost it."""
+        if scraper_state.backend.refresh_lock(lock_name, lock_owner, LOCK_TTL_SECONDS):
+            scraper_state.heartbeat()
+            return True
+        log.error("Lost harvest lock, aborting", extra={"lock": lock_name})
+        scraper_state.set_status("ERROR", "🔒 Lost the harvest lock. Stopping.")
+        return False
+
+    try:
+        _run_harvest(headless_mode, keep_lock)
+    finally:
+        scraper_state.backend.release_lock(lock_name, lock_owner)
+    return True
+
+def _run_harvest(headless_mode, keep_lock):
     TARGET_POSTS = 50 
-    scraper_state.reset_state()
-    scraper_state.set_status("RUNNING", "🚀 Starting Chrome...")
+    scraper_state.reset_state("RUNNING", "🚀 Starting Chrome...")
     
     options = webdriver.ChromeOptions()
     options.add_argument("--disable-notifications")
@@ -77,7 +111,7 @@ def start_feed_harvest(headless_mode=False):
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
     
     try:
-        if not login_to_linkedin(driver):
+        if not keep_lock() or not login_to_linkedin(driver, keep_lock):
             return
 
         scraper_state.set_status("RUNNING", "🚜 Loading Feed...")
@@ -93,6 +127,8 @@ def start_feed_harvest(headless_mode=False):
         body_elem = driver.find_element(By.TAG_NAME, "body")
 
         while collected_count < TARGET_POSTS:
+            if not keep_lock():
+                return
             scraper_state.set_status("RUNNING", f"👀 Scanning... ({collected_count}/{TARGET_POSTS})")
             
             # --- THE FIX: ANCHOR SEARCH ---
@@ -142,6 +178,7 @@ def start_feed_harvest(headless_mode=False):
             
             # Save Batch
             if batch:
+                SCRAPER_POSTS_SCRAPED.inc(len(batch))
                 save_scraped_posts_to_db(batch)
                 collected_count += len(batch)
                 scraper_state.set_status("RUNNING", f"💾 Saved {len(batch)} new posts. Total: {collected_count}")
@@ -157,15 +194,20 @@ def start_feed_harvest(headless_mode=False):
             time.sleep(2)
             
             if scroll_stuck_count > 6:
+                SCRAPER_REFRESHES.inc()
                 scraper_state.set_status("RUNNING", "🔄 Stuck. Refreshing page...")
                 driver.refresh()
                 time.sleep(5)
                 body_elem = driver.find_element(By.TAG_NAME, "body")
                 scroll_stuck_count = 0
 
+        scraper_state.set_status("RUNNING", "🧊 Archiving old posts...")
+        archive_cold_posts()
+
         scraper_state.set_status("COMPLETED", f"Harvest Complete! Collected {collected_count} posts.")
 
     except Exception as e:
         scraper_state.set_status("ERROR", f"Error: {str(e)}")
     finally:
+        SCRAPER_RUNS.labels(scraper_state.get_state()["status"]).inc()
         driver.quit()
\ No newline at end of file
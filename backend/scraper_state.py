@@ -1,24 +1,35 @@
 # backend/scraper_state.py
 
-# This dictionary holds the live status of the scraper
-state = {
-    "status": "IDLE",       # Options: IDLE, RUNNING, WAITING_FOR_OTP, COMPLETED, ERROR
-    "message": "Ready",     # Status text (e.g., "Logging in...")
-    "otp_input": None,      # Where we store the OTP sent from Frontend
-    "logs": []              # To show a mini-log in the popup
-}
+# The live status of the scraper lives in a shared backend (see state_backend.py)
+# so every API worker, replica and the scraper worker see the same thing.
+# Status options: IDLE, QUEUED, RUNNING, WAITING_FOR_OTP, COMPLETED, ERROR
+from state_backend import create_backend
+
+backend = create_backend()
+
+def get_state():
+    """Status, message and the last few log lines (never the OTP)."""
+    return backend.get_state()
 
 def set_status(status, message=None):
-    state["status"] = status
-    if message:
-        state["message"] = message
-        state["logs"].append(message)
-        # Keep logs short (last 10 lines)
-        if len(state["logs"]) > 10:
-            state["logs"].pop(0)
-
-def reset_state():
-    state["status"] = "IDLE"
-    state["message"] = "Ready"
-    state["otp_input"] = None
-    state["logs"] = []
\ No newline at end of file
+    backend.set_status(status, message)
+
+def try_queue(message):
+    """Atomically moves to QUEUED unless a harvest is active; False if one is."""
+    return backend.try_queue(message)
+
+def heartbeat():
+    """Keeps an active harvest from being treated as stale (see STATE_TTL_SECONDS)."""
+    backend.heartbeat()
+
+def reset_state(status, message):
+    """Starts a fresh run: clears logs/OTP and sets the new status in one write."""
+    backend.reset_state(status, message)
+
+def submit_otp(otp):
+    """Called by the API when the user types the OTP in the popup."""
+    backend.put_otp(otp)
+
+def take_otp():
+    """Called by the scraper; returns the OTP once (or None if not sent yet)."""
+    return backend.pop_otp()
@@ -5,6 +5,10 @@ import os
 import time
 from dotenv import load_dotenv
 from database import history_collection
+from metrics import timed
+from logger import get_logger
+
+log = get_logger(__name__)
 
 load_dotenv()
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
@@ -17,56 +21,70 @@ TEXT_MODEL_NAME = 'gemini-2.5-flash'
 model = genai.GenerativeModel(TEXT_MODEL_NAME)
 
 # --- IMAGE GENERATION (Hugging Face) ---
-def generate_image(prompt_text):
-    print(f"🎨 Painting Image via Hugging Face: {prompt_text[:30]}...")
-    API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
+SDXL_API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
+
+@timed("sdxl_image")
+def ask_sdxl(prompt_text):
+    # Raises on non-200 so the stage is recorded as an error
     headers = {"Authorization": f"Bearer {HF_KEY}"}
-    
+    response = requests.post(SDXL_API_URL, headers=headers, json={"inputs": prompt_text})
+    response.raise_for_status()
+    return response.content
+
+def generate_image(prompt_text):
+    log.info("Painting image via Hugging Face", extra={"prompt": prompt_text[:30]})
     try:
-        response = requests.post(API_URL, headers=headers, json={"inputs": prompt_text})
-        if response.status_code == 200:
-            img_str = base64.b64encode(response.content).decode("utf-8")
-            return f"data:image/png;base64,{img_str}"
-        return None
+        img_str = base64.b64encode(ask_sdxl(prompt_text)).decode("utf-8")
+        return f"data:image/png;base64,{img_str}"
     except Exception as e:
-        print(f"❌ Image Error: {e}")
+        log.error("Image generation failed", extra={"error": str(e)})
         return None
 
 # --- TEXT GENERATION ---
-def generate_post_content(inputs):
-    try:
-        print(f"🧠 Sending to Gemini Writer ({TEXT_MODEL_NAME})...")
-        ai_response = model.generate_content(inputs).text
-        
-        post_content = ""
-        image_prompt = ""
-        
-        if "[IMAGE]" in ai_response:
-            parts = ai_response.split("[IMAGE]")
-            post_content = parts[0].replace("[POST]", "").strip()
-            image_prompt = parts[1].strip()
-        else:
-            post_content = ai_response
-            image_prompt = "Abstract tech background, cinematic lighting, 8k."
+@timed("gemini_text")
+def ask_gemini(inputs):
+    return model.generate_content(inputs).text
+
+@timed("generate_post_content")
+def write_post(inputs):
+    # Raises on Gemini failure so the stage is recorded as an error
+    log.info("Sending to Gemini writer", extra={"model": TEXT_MODEL_NAME})
+    ai_response = ask_gemini(inputs)
+    
+    post_content = ""
+    image_prompt = ""
+    
+    if "[IMAGE]" in ai_response:
+        parts = ai_response.split("[IMAGE]")
+        post_content = parts[0].replace("[POST]", "").strip()
+        image_prompt = parts[1].strip()
+    else:
+        post_content = ai_response
+        image_prompt = "Abstract tech background, cinematic lighting, 8k."
 
-        image_url = generate_image(image_prompt)
-        return post_content, image_url
+    image_url = generate_image(image_prompt)
+    return post_content, image_url
 
+def generate_post_content(inputs):
+    try:
+        return write_post(inputs)
     except Exception as e:
-        print(f"❌ Gemini Error: {e}")
+        log.error("Gemini request failed", extra={"error": str(e)})
         return f"AI Error: {str(e)}", None
 
 # --- HISTORY SAVER ---
-def save_to_history(data):
-    print("💾 Attempting to save to MongoDB...")
+@timed("save_to_history")
+def insert_history(data):
+    # Raises when the DB is missing or the insert fails so the stage is recorded as an error
     if history_collection is None:
-        print("❌ CRITICAL: Database connection is missing! Cannot save.")
-        return
+        raise RuntimeError("Database connection is missing")
+    data["timestamp"] = time.time()
+    return str(history_collection.insert_one(data).inserted_id)
 
+def save_to_history(data):
     try:
-        data["timestamp"] = time.time()
-        result = history_collection.insert_one(data)
-        print(f"✅ SUCCESS: Saved to History! (ID: {result.inserted_id})")
-        return str(result.inserted_id)
+        inserted_id = insert_history(data)
+        log.info("Saved to history", extra={"id": inserted_id})
+        return inserted_id
     except Exception as e:
-        print(f"❌ Database Save Failed: {e}")
\ No newline at end of file
+        log.error("History save failed", extra={"error": str(e)})
\ No newline at end of file
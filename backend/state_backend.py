@@ -0,0 +1,421 @@
+# backend/state_backend.py
+# Shared scraper state, OTP hand-off, harvest locks and the scrape job queue.
+# Every API worker / replica and the scraper worker talk to the same backend,
+# so /scraper-status and /submit-otp work no matter which process serves them.
+#
+# STATE_BACKEND=memory (default) -> single process, scraper runs inside the API (no worker)
+# STATE_BACKEND=mongo            -> collections in the "scraping" database
+# STATE_BACKEND=redis            -> Redis-compatible server at REDIS_URL (needs Lua scripting)
+# mongo/redis hand scrapes to `python worker.py` (see worker.py).
+
+import os
+import time
+import uuid
+import datetime
+import threading
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from logger import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+MAX_LOGS = 10
+OTP_TTL_SECONDS = 600
+
+# A harvest counts as "active" only while it keeps heart-beating; a worker that
+# died mid-run stops blocking new triggers once its last update is this old.
+ACTIVE_STATUSES = ("QUEUED", "RUNNING", "WAITING_FOR_OTP")
+STATE_TTL_SECONDS = 300
+# The harvest lock is refreshed together with the heartbeat, so with equal TTLs a
+# stale state always means the dead harvest's lock has expired too.
+LOCK_TTL_SECONDS = STATE_TTL_SECONDS
+# Finished jobs are kept this long for debugging, then dropped
+JOB_RETENTION_SECONDS = 86400
+
+
+def default_state():
+    return {"status": "IDLE", "message": "Ready", "logs": [], "updated_at": 0}
+
+
+def fresh_state(status, message):
+    return {"status": status, "message": message, "logs": [message], "updated_at": time.time()}
+
+
+def is_active(state, now=None):
+    now = time.time() if now is None else now
+    return state["status"] in ACTIVE_STATUSES and float(state["updated_at"]) > now - STATE_TTL_SECONDS
+
+
+# ==========================================
+# 🧠 IN-MEMORY (single process)
+# ==========================================
+class MemoryBackend:
+    shared = False
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._state = default_state()
+        self._otp = None
+        self._locks = {}
+        self._jobs = []
+
+    def get_state(self):
+        with self._mutex:
+            return {**self._state, "logs": list(self._state["logs"])}
+
+    def _set(self, status, message):
+        self._state["status"] = status
+        self._state["updated_at"] = time.time()
+        if message:
+            self._state["message"] = message
+            self._state["logs"] = (self._state["logs"] + [message])[-MAX_LOGS:]
+
+    def set_status(self, status, message=None):
+        with self._mutex:
+            self._set(status, message)
+
+    def try_queue(self, message):
+        with self._mutex:
+            if is_active(self._state):
+                return False
+            self._set("QUEUED", message)
+            return True
+
+    def heartbeat(self):
+        with self._mutex:
+            self._state["updated_at"] = time.time()
+
+    def reset_state(self, status, message):
+        with self._mutex:
+            self._state = fresh_state(status, message)
+            self._otp = None
+
+    def put_otp(self, otp):
+        with self._mutex:
+            self._otp = (otp, time.time())
+
+    def pop_otp(self):
+        with self._mutex:
+            otp, self._otp = self._otp, None
+            if otp is None or otp[1] < time.time() - OTP_TTL_SECONDS:
+                return None
+            return otp[0]
+
+    def acquire_lock(self, name, owner, ttl):
+        with self._mutex:
+            holder, expires_at = self._locks.get(name, (None, 0))
+            if holder not in (None, owner) and expires_at > time.time():
+                return False
+            self._locks[name] = (owner, time.time() + ttl)
+            return True
+
+    def refresh_lock(self, name, owner, ttl):
+        with self._mutex:
+            holder, expires_at = self._locks.get(name, (None, 0))
+            if holder != owner or expires_at <= time.time():
+                return False
+            self._locks[name] = (owner, time.time() + ttl)
+            return True
+
+    def release_lock(self, name, owner):
+        with self._mutex:
+            if self._locks.get(name, (None, 0))[0] == owner:
+                del self._locks[name]
+
+    def enqueue_job(self, job):
+        with self._mutex:
+            job = {**job, "id": uuid.uuid4().hex, "status": "queued", "created_at": time.time()}
+            self._jobs.append(job)
+            return job["id"]
+
+    def claim_job(self, worker_id):
+        with self._mutex:
+            for job in self._jobs:
+                if job["status"] == "queued":
+                    job.update(status="running", worker=worker_id, started_at=time.time())
+                    return dict(job)
+            return None
+
+    def finish_job(self, job_id, status):
+        with self._mutex:
+            for job in self._jobs:
+                if job["id"] == job_id:
+                    job.update(status=status, finished_at=time.time())
+            self._jobs = [j for j in self._jobs if j["status"] in ("queued", "running")]
+
+
+# ==========================================
+# 🍃 MONGODB
+# ==========================================
+class MongoBackend:
+    shared = True
+    STATE_ID = "scraper"
+
+    def __init__(self, db):
+        self.state = db["scraper_state"]
+        self.otp = db["scraper_otp"]
+        self.locks = db["scraper_locks"]
+        self.jobs = db["scraper_jobs"]
+        self.jobs.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        self.jobs.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+        # Mongo drops an unused OTP on its own; pop_otp also filters in between TTL sweeps
+        self.otp.create_index("created_at", expireAfterSeconds=OTP_TTL_SECONDS)
+
+    def get_state(self):
+        doc = self.state.find_one({"_id": self.STATE_ID}, {"_id": 0})
+        return {**default_state(), **(doc or {})}
+
+    def _update(self, status, message):
+        update = {"$set": {"status": status, "updated_at": time.time()}}
+        if message:
+            update["$set"]["message"] = message
+            update["$push"] = {"logs": {"$each": [message], "$slice": -MAX_LOGS}}
+        return update
+
+    def set_status(self, status, message=None):
+        self.state.update_one({"_id": self.STATE_ID}, self._update(status, message), upsert=True)
+
+    def try_queue(self, message):
+        now = time.time()
+        try:
+            # Matches an idle/finished or stale state; an active one makes the
+            # upsert collide on _id, same trick as acquire_lock.
+            self.state.find_one_and_update(
+                {"_id": self.STATE_ID, "$or": [
+                    {"status": {"$nin": list(ACTIVE_STATUSES)}},
+                    {"updated_at": {"$lte": now - STATE_TTL_SECONDS}},
+                ]},
+                self._update("QUEUED", message),
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def heartbeat(self):
+        self.state.update_one({"_id": self.STATE_ID}, {"$set": {"updated_at": time.time()}})
+
+    def reset_state(self, status, message):
+        # One write, straight into the new status, so try_queue never sees an idle gap
+        self.state.replace_one({"_id": self.STATE_ID}, fresh_state(status, message), upsert=True)
+        self.otp.delete_many({})
+
+    def put_otp(self, otp):
+        self.otp.replace_one(
+            {"_id": self.STATE_ID},
+            {"otp": otp, "created_at": datetime.datetime.now(datetime.timezone.utc)},
+            upsert=True,
+        )
+
+    def pop_otp(self):
+        # Read-and-delete in one step so the OTP is consumed exactly once
+        fresh_after = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=OTP_TTL_SECONDS)
+        doc = self.otp.find_one_and_delete({"_id": self.STATE_ID, "created_at": {"$gte": fresh_after}})
+        return doc["otp"] if doc else None
+
+    def acquire_lock(self, name, owner, ttl):
+        now = time.time()
+        try:
+            # Matches a free/expired lock or one we already hold; otherwise the
+            # upsert collides on _id and we know someone else has it.
+            self.locks.find_one_and_update(
+                {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+                {"$set": {"owner": owner, "expires_at": now + ttl}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def refresh_lock(self, name, owner, ttl):
+        now = time.time()
+        result = self.locks.update_one(
+            {"_id": name, "owner": owner, "expires_at": {"$gt": now}},
+            {"$set": {"expires_at": now + ttl}},
+        )
+        return result.matched_count == 1
+
+    def release_lock(self, name, owner):
+        self.locks.delete_one({"_id": name, "owner": owner})
+
+    def enqueue_job(self, job):
+        result = self.jobs.insert_one({**job, "status": "queued", "created_at": time.time()})
+        return str(result.inserted_id)
+
+    def claim_job(self, worker_id):
+        job = self.jobs.find_one_and_update(
+            {"status": "queued"},
+            {"$set": {"status": "running", "worker": worker_id, "started_at": time.time()}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job:
+            job["id"] = str(job.pop("_id"))
+        return job
+
+    def finish_job(self, job_id, status):
+        self.jobs.update_one(
+            {"_id": ObjectId(job_id)},
+            # A date, so the TTL index on finished_at can expire it
+            {"$set": {"status": status, "finished_at": datetime.datetime.now(datetime.timezone.utc)}},
+        )
+
+
+# ==========================================
+# 🟥 REDIS (or any Redis-compatible server)
+# ==========================================
+class RedisBackend:
+    shared = True
+    PREFIX = "buzzbuilder:scraper:"
+
+    # Only touch the lock if we still own it
+    _REFRESH = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    # KEYS: state, logs  ARGV: now, state ttl, message, max logs, active statuses...
+    _TRY_QUEUE = """
+local status = redis.call('hget', KEYS[1], 'status')
+local updated = tonumber(redis.call('hget', KEYS[1], 'updated_at') or '0')
+local now = tonumber(ARGV[1])
+for i = 5, #ARGV do
+  if status == ARGV[i] and updated > now - tonumber(ARGV[2]) then return 0 end
+end
+redis.call('hset', KEYS[1], 'status', 'QUEUED', 'message', ARGV[3], 'updated_at', ARGV[1])
+redis.call('rpush', KEYS[2], ARGV[3])
+redis.call('ltrim', KEYS[2], -tonumber(ARGV[4]), -1)
+return 1
+"""
+    # GET + DEL in one step (GETDEL itself needs Redis >= 6.2)
+    _POP_OTP = "local otp = redis.call('get', KEYS[1]) if otp then redis.call('del', KEYS[1]) end return otp"
+    # KEYS: queue  ARGV: job key prefix, worker id, now
+    _CLAIM_JOB = """
+local job_id = redis.call('lpop', KEYS[1])
+if not job_id then return nil end
+local key = ARGV[1] .. job_id
+redis.call('hset', key, 'status', 'running', 'worker', ARGV[2], 'started_at', ARGV[3])
+return redis.call('hgetall', key)
+"""
+
+    def __init__(self, client):
+        # client: redis.Redis(..., decode_responses=True)
+        self.r = client
+        self.r.ping()
+        self._refresh = self.r.register_script(self._REFRESH)
+        self._release = self.r.register_script(self._RELEASE)
+        self._try_queue = self.r.register_script(self._TRY_QUEUE)
+        self._pop_otp = self.r.register_script(self._POP_OTP)
+        self._claim_job = self.r.register_script(self._CLAIM_JOB)
+
+    def _key(self, *parts):
+        return self.PREFIX + ":".join(parts)
+
+    def get_state(self):
+        pipe = self.r.pipeline()
+        pipe.hgetall(self._key("state"))
+        pipe.lrange(self._key("logs"), 0, -1)
+        fields, logs = pipe.execute()
+        state = {**default_state(), **fields, "logs": logs}
+        state["updated_at"] = float(state["updated_at"])
+        return state
+
+    def set_status(self, status, message=None):
+        pipe = self.r.pipeline(transaction=True)
+        pipe.hset(self._key("state"), mapping={"status": status, "updated_at": time.time()})
+        if message:
+            pipe.hset(self._key("state"), "message", message)
+            pipe.rpush(self._key("logs"), message)
+            pipe.ltrim(self._key("logs"), -MAX_LOGS, -1)
+        pipe.execute()
+
+    def try_queue(self, message):
+        keys = [self._key("state"), self._key("logs")]
+        args = [time.time(), STATE_TTL_SECONDS, message, MAX_LOGS, *ACTIVE_STATUSES]
+        return bool(self._try_queue(keys=keys, args=args))
+
+    def heartbeat(self):
+        self.r.hset(self._key("state"), "updated_at", time.time())
+
+    def reset_state(self, status, message):
+        # MULTI/EXEC: readers see either the old state or the new one, never an idle gap
+        state = fresh_state(status, message)
+        pipe = self.r.pipeline(transaction=True)
+        pipe.delete(self._key("state"), self._key("logs"), self._key("otp"))
+        pipe.hset(self._key("state"), mapping={"status": status, "message": message, "updated_at": state["updated_at"]})
+        pipe.rpush(self._key("logs"), message)
+        pipe.execute()
+
+    def put_otp(self, otp):
+        self.r.set(self._key("otp"), otp, ex=OTP_TTL_SECONDS)
+
+    def pop_otp(self):
+        return self._pop_otp(keys=[self._key("otp")])
+
+    def acquire_lock(self, name, owner, ttl):
+        key = self._key("lock", name)
+        if self.r.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        return self.refresh_lock(name, owner, ttl)
+
+    def refresh_lock(self, name, owner, ttl):
+        return bool(self._refresh(keys=[self._key("lock", name)], args=[owner, int(ttl * 1000)]))
+
+    def release_lock(self, name, owner):
+        self._release(keys=[self._key("lock", name)], args=[owner])
+
+    def enqueue_job(self, job):
+        job_id = uuid.uuid4().hex
+        record = {**job, "id": job_id, "status": "queued", "created_at": time.time()}
+        pipe = self.r.pipeline(transaction=True)
+        pipe.hset(self._key("job", job_id), mapping={k: str(v) for k, v in record.items()})
+        pipe.rpush(self._key("jobs"), job_id)
+        pipe.execute()
+        return job_id
+
+    def claim_job(self, worker_id):
+        # Pop + mark running atomically so a crash can't lose a popped job's status
+        flat = self._claim_job(keys=[self._key("jobs")], args=[self._key("job", ""), worker_id, time.time()])
+        if not flat:
+            return None
+        job = dict(zip(flat[::2], flat[1::2]))
+        job["created_at"] = float(job["created_at"])
+        return job
+
+    def finish_job(self, job_id, status):
+        key = self._key("job", job_id)
+        pipe = self.r.pipeline(transaction=True)
+        pipe.hset(key, mapping={"status": status, "finished_at": time.time()})
+        pipe.expire(key, JOB_RETENTION_SECONDS)
+        pipe.execute()
+
+
+# ==========================================
+# 🔌 FACTORY
+# ==========================================
+def create_backend():
+    if STATE_BACKEND == "memory":
+        return MemoryBackend()
+
+    if STATE_BACKEND == "redis":
+        try:
+            import redis
+
+            backend = RedisBackend(redis.Redis.from_url(REDIS_URL, decode_responses=True))
+            log.info("Scraper state backend ready", extra={"backend": "redis"})
+            return backend
+        except Exception as e:
+            log.error("Redis state backend unavailable", extra={"error": str(e)})
+    else:
+        # Imported here so memory/redis setups never open a Mongo connection
+        from database import db
+
+        if db is not None:
+            log.info("Scraper state backend ready", extra={"backend": "mongo"})
+            return MongoBackend(db)
+
+    log.warning("Falling back to in-memory scraper state (single process only)")
+    return MemoryBackend()
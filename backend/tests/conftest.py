@@ -0,0 +1,11 @@
+import os
+import sys
+
+import mongomock
+import pymongo
+
+# Backend modules import each other as top-level modules (e.g. `from logger import ...`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# database.py connects at import time; point it at an in-memory Mongo instead of Atlas
+pymongo.MongoClient = mongomock.MongoClient
@@ -0,0 +1,144 @@
+import datetime
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+import archive
+import database
+from routers import analytics
+
+DAY = 86400
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    database.viral_collection.delete_many({})
+    yield str(tmp_path)
+    database.viral_collection.delete_many({})
+
+
+def add_post(ts, likes=1, content=None):
+    doc = {"content": content or f"post {ts}", "likes": likes, "source": "Home Feed", "timestamp": ts}
+    database.viral_collection.insert_one(doc)
+    return doc
+
+
+def read_partition(archive_dir, day):
+    with gzip.open(os.path.join(archive_dir, f"{day}.json.gz"), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- ARCHIVER ---
+def test_archive_moves_only_cold_posts():
+    cutoff = archive.hot_cutoff()
+    cold = [add_post(cutoff - 5 * DAY, likes=i) for i in range(3)]
+    add_post(cutoff + 3600)
+    add_post(time.time())
+
+    assert archive.archive_cold_posts() == 3
+    assert database.viral_collection.count_documents({}) == 2
+
+    posts = archive.find_archived_posts(0, cutoff)
+    assert sorted(p["_id"] for p in posts) == sorted(str(d["_id"]) for d in cold)
+    assert {p["content"] for p in posts} == {d["content"] for d in cold}
+
+
+def test_archive_is_idempotent_when_mongo_delete_was_missed(archive_dir):
+    ts = archive.hot_cutoff() - 10 * DAY
+    doc = add_post(ts)
+    archive.archive_cold_posts()
+
+    # Simulate a crash between writing the partition and deleting from Mongo
+    database.viral_collection.insert_one(doc)
+    assert archive.archive_cold_posts() == 1
+
+    columns = read_partition(archive_dir, archive._day_key(ts))
+    assert columns["_id"] == [str(doc["_id"])]
+    assert database.viral_collection.count_documents({}) == 0
+
+
+def test_archive_without_archive_dir_keeps_everything(monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", None)
+    add_post(archive.hot_cutoff() - 10 * DAY)
+    assert archive.archive_cold_posts() == 0
+    assert database.viral_collection.count_documents({}) == 1
+
+
+def test_partitions_are_named_by_utc_day(archive_dir):
+    late_utc = datetime.datetime(2024, 3, 1, 23, 30, tzinfo=datetime.timezone.utc).timestamp()
+    add_post(late_utc)
+    archive.archive_cold_posts()
+    assert os.listdir(archive_dir).count("2024-03-01.json.gz") == 1
+
+
+# --- MANIFEST ---
+def test_manifest_counts_per_hour():
+    base = datetime.datetime(2024, 3, 1, 9, 0, tzinfo=datetime.timezone.utc).timestamp()
+    add_post(base + 60, likes=10)
+    add_post(base + 120, likes=5)
+    add_post(base + 3600 + 60, likes=1)
+    archive.archive_cold_posts()
+
+    assert archive.archived_post_count() == 3
+    hours = archive.archived_sessions()
+    assert hours["2024-03-01 09:00"] == {"count": 2, "likes": 15, "timestamp": base + 60}
+    assert hours["2024-03-01 10:00"]["count"] == 1
+
+
+def test_missing_or_outdated_manifest_is_rebuilt(archive_dir):
+    base = datetime.datetime(2024, 3, 1, 9, 0, tzinfo=datetime.timezone.utc).timestamp()
+    add_post(base)
+    add_post(base + 1)
+    archive.archive_cold_posts()
+
+    manifest_path = os.path.join(archive_dir, "2024-03-01.sessions.json")
+    os.remove(manifest_path)
+    assert archive.archived_post_count() == 2
+    assert os.path.exists(manifest_path)
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"count": 99, "hours": {}}, f)
+    assert archive.archived_post_count() == 2
+
+
+# --- READER ---
+def test_find_archived_posts_sorts_by_likes_and_limits():
+    ts = archive.hot_cutoff() - 3 * DAY
+    for likes in (3, 50, 7, 20):
+        add_post(ts + likes, likes=likes)
+    archive.archive_cold_posts()
+
+    posts = archive.find_archived_posts(ts - 1, ts + 100, limit=2, fields=["content"])
+    assert [p["likes"] for p in posts] == [50, 20]
+
+
+# --- HOT + COLD MERGE IN THE API ---
+def test_posts_by_session_merges_both_tiers():
+    cutoff = archive.hot_cutoff()
+    add_post(cutoff - 600, likes=5, content="cold")
+    archive.archive_cold_posts()
+    add_post(cutoff + 600, likes=9, content="hot")
+    add_post(cutoff + 900, likes=1, content="hot small")
+
+    posts = analytics.get_posts_by_session(timestamp=cutoff, limit=2)
+    assert [p["content"] for p in posts] == ["hot", "cold"]
+    assert all(isinstance(p["_id"], str) for p in posts)
+
+
+def test_sessions_include_archived_hours():
+    cold_ts = int(archive.hot_cutoff() - 10 * DAY) // 3600 * 3600 + 60
+    add_post(cold_ts, likes=4)
+    add_post(cold_ts + 1, likes=6)
+    archive.archive_cold_posts()
+    add_post(time.time(), likes=2)
+
+    sessions = analytics.get_harvest_sessions()
+    cold_label = datetime.datetime.fromtimestamp(cold_ts).strftime("%Y-%m-%d %H:00")
+    by_label = {s["label"]: s for s in sessions}
+    assert by_label[cold_label]["count"] == 2
+    assert by_label[cold_label]["avg_likes"] == 10
+    assert sum(s["count"] for s in sessions) == 3
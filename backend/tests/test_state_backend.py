@@ -0,0 +1,165 @@
+import datetime
+import time
+
+import fakeredis
+import mongomock
+import pytest
+
+import state_backend
+from state_backend import MemoryBackend, MongoBackend, RedisBackend
+
+
+@pytest.fixture(params=["memory", "mongo", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "mongo":
+        return MongoBackend(mongomock.MongoClient()["scraping"])
+    # fakeredis runs the Lua scripts via lupa
+    return RedisBackend(fakeredis.FakeRedis(decode_responses=True))
+
+
+# --- LOCKS ---
+def test_lock_is_exclusive_and_reentrant(backend):
+    assert backend.acquire_lock("harvest:a", "w1", 60) is True
+    assert backend.acquire_lock("harvest:a", "w1", 60) is True
+    assert backend.acquire_lock("harvest:a", "w2", 60) is False
+
+
+def test_release_frees_lock_only_for_owner(backend):
+    backend.acquire_lock("harvest:a", "w1", 60)
+    backend.release_lock("harvest:a", "w2")
+    assert backend.acquire_lock("harvest:a", "w2", 60) is False
+    backend.release_lock("harvest:a", "w1")
+    assert backend.acquire_lock("harvest:a", "w2", 60) is True
+
+
+def test_expired_lock_can_be_taken_over(backend, monkeypatch):
+    if isinstance(backend, RedisBackend):
+        pytest.skip("Redis expires keys on its own clock; covered by PX on SET")
+    backend.acquire_lock("harvest:a", "w1", 60)
+    later = time.time() + 120
+    monkeypatch.setattr(state_backend.time, "time", lambda: later)
+    assert backend.refresh_lock("harvest:a", "w1", 60) is False
+    assert backend.acquire_lock("harvest:a", "w2", 60) is True
+
+
+def test_refresh_lock_requires_ownership(backend):
+    backend.acquire_lock("harvest:a", "w1", 60)
+    assert backend.refresh_lock("harvest:a", "w1", 60) is True
+    assert backend.refresh_lock("harvest:a", "w2", 60) is False
+
+
+# --- OTP ---
+def test_otp_is_consumed_once(backend):
+    assert backend.pop_otp() is None
+    backend.put_otp("123456")
+    assert backend.pop_otp() == "123456"
+    assert backend.pop_otp() is None
+
+
+def test_stale_otp_is_ignored(backend, monkeypatch):
+    backend.put_otp("123456")
+    if isinstance(backend, RedisBackend):
+        # Redis drops it by itself via EX
+        assert 0 < backend.r.ttl(backend._key("otp")) <= state_backend.OTP_TTL_SECONDS
+        return
+    # Anything stored is already older than a negative TTL
+    monkeypatch.setattr(state_backend, "OTP_TTL_SECONDS", -1)
+    assert backend.pop_otp() is None
+
+
+def test_state_never_exposes_otp(backend):
+    backend.put_otp("123456")
+    assert "123456" not in str(backend.get_state())
+
+
+# --- STATUS / QUEUEING ---
+def test_logs_are_capped(backend):
+    for i in range(state_backend.MAX_LOGS + 5):
+        backend.set_status("RUNNING", str(i))
+    state = backend.get_state()
+    assert len(state["logs"]) == state_backend.MAX_LOGS
+    assert state["message"] == str(state_backend.MAX_LOGS + 4)
+
+
+def test_try_queue_blocks_while_active(backend):
+    assert backend.try_queue("queued") is True
+    assert backend.try_queue("queued") is False
+    backend.set_status("WAITING_FOR_OTP", "otp")
+    assert backend.try_queue("queued") is False
+    backend.set_status("COMPLETED", "done")
+    assert backend.try_queue("queued") is True
+    assert backend.get_state()["status"] == "QUEUED"
+
+
+def test_reset_state_goes_straight_to_new_status(backend):
+    backend.set_status("COMPLETED", "old run")
+    backend.put_otp("123456")
+    backend.reset_state("RUNNING", "starting")
+
+    state = backend.get_state()
+    assert (state["status"], state["message"], state["logs"]) == ("RUNNING", "starting", ["starting"])
+    assert backend.try_queue("queued") is False
+    assert backend.pop_otp() is None
+
+
+def test_stale_state_implies_expired_lock():
+    assert state_backend.LOCK_TTL_SECONDS <= state_backend.STATE_TTL_SECONDS
+
+
+def test_try_queue_ignores_stale_active_state(backend, monkeypatch):
+    backend.set_status("RUNNING", "worker died here")
+    later = time.time() + state_backend.STATE_TTL_SECONDS + 1
+    monkeypatch.setattr(state_backend.time, "time", lambda: later)
+    assert backend.try_queue("queued") is True
+
+
+def test_heartbeat_keeps_state_active(backend, monkeypatch):
+    backend.set_status("RUNNING", "scanning")
+    later = time.time() + state_backend.STATE_TTL_SECONDS - 1
+    monkeypatch.setattr(state_backend.time, "time", lambda: later)
+    backend.heartbeat()
+    monkeypatch.setattr(state_backend.time, "time", lambda: later + 2)
+    assert backend.try_queue("queued") is False
+
+
+# --- JOBS ---
+def test_jobs_are_claimed_once_in_order(backend):
+    first = backend.enqueue_job({"kind": "feed_harvest"})
+    second = backend.enqueue_job({"kind": "feed_harvest"})
+    assert backend.claim_job("w1")["id"] == first
+    assert backend.claim_job("w2")["id"] == second
+    assert backend.claim_job("w3") is None
+    backend.finish_job(first, "done")
+    backend.finish_job(second, "done")
+    assert backend.claim_job("w1") is None
+
+
+def test_claimed_job_carries_created_at(backend):
+    backend.enqueue_job({"kind": "feed_harvest"})
+    job = backend.claim_job("w1")
+    assert job["status"] == "running"
+    assert job["worker"] == "w1"
+    assert isinstance(job["created_at"], float)
+
+
+def test_mongo_finished_jobs_expire():
+    db = mongomock.MongoClient()["scraping"]
+    backend = MongoBackend(db)
+    job_id = backend.enqueue_job({"kind": "feed_harvest"})
+    backend.claim_job("w1")
+    backend.finish_job(job_id, "done")
+
+    ttl_indexes = [ix for ix in db["scraper_jobs"].index_information().values() if "expireAfterSeconds" in ix]
+    assert ttl_indexes[0]["key"] == [("finished_at", 1)]
+    assert isinstance(db["scraper_jobs"].find_one()["finished_at"], datetime.datetime)
+
+
+def test_redis_finished_jobs_expire():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    backend = RedisBackend(client)
+    job_id = backend.enqueue_job({"kind": "feed_harvest"})
+    backend.claim_job("w1")
+    backend.finish_job(job_id, "done")
+    assert 0 < client.ttl(RedisBackend.PREFIX + "job:" + job_id) <= state_backend.JOB_RETENTION_SECONDS
@@ -0,0 +1,77 @@
+# backend/worker.py
+# Runs scraper jobs outside the API so uvicorn can scale to many workers/replicas.
+#
+#   uvicorn main:app --workers 4     # API (any number of processes / nodes)
+#   python worker.py                 # scraper (needs Chrome; one per account is enough)
+#
+# Both sides must use the same shared STATE_BACKEND (mongo or redis); with the
+# default STATE_BACKEND=memory the API runs the scraper itself and no worker is used.
+#
+# Metrics: scraper counters (scraper_runs_total, scraper_posts_*_total, ...) live in
+# this process, so the worker serves its own Prometheus endpoint on
+# WORKER_METRICS_PORT (default 9101, 0 disables). Scrape it next to the API's /metrics.
+#
+# Archiving: each harvest also moves cold posts out of Mongo into ARCHIVE_DIR
+# (see archive.py). The worker and every API replica must mount the SAME
+# ARCHIVE_DIR (NFS/EFS/...), otherwise API nodes lose the archived sessions.
+# Archiving is skipped entirely while ARCHIVE_DIR is not set.
+
+import os
+import socket
+import time
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+import scraper_state
+from scraper import start_feed_harvest
+from logger import get_logger
+
+load_dotenv()
+log = get_logger(__name__)
+
+POLL_INTERVAL_SECONDS = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+HEADLESS = os.getenv("SCRAPER_HEADLESS", "false").lower() == "true"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+
+
+def run_forever():
+    if not scraper_state.backend.shared:
+        log.error("Scraper worker needs a shared STATE_BACKEND (mongo or redis)")
+        return
+
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+
+    log.info("Scraper worker started", extra={"worker": WORKER_ID, "headless": HEADLESS, "metrics_port": METRICS_PORT})
+    last_started = 0
+    while True:
+        job = scraper_state.backend.claim_job(WORKER_ID)
+        if job is None:
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        # A harvest that started after this job was queued already covered it
+        if job["created_at"] < last_started:
+            scraper_state.backend.finish_job(job["id"], "skipped")
+            log.info("Skipping superseded scraper job", extra={"job_id": job["id"]})
+            continue
+
+        log.info("Claimed scraper job", extra={"job_id": job["id"]})
+        last_started = time.time()
+        status = "failed"
+        try:
+            ran = start_feed_harvest(headless_mode=HEADLESS)
+            status = "done" if ran else "skipped"
+            if not ran and scraper_state.get_state()["status"] == "QUEUED":
+                # Another harvest holds the lock; don't leave the popup waiting forever
+                scraper_state.set_status("ERROR", "🔒 Another harvest is already running for this account.")
+        except Exception as e:
+            log.error("Scraper job crashed", extra={"job_id": job["id"], "error": str(e)})
+            scraper_state.set_status("ERROR", f"Scraper crashed: {str(e)}")
+        finally:
+            scraper_state.backend.finish_job(job["id"], status)
+            log.info("Scraper job finished", extra={"job_id": job["id"], "status": status})
+
+
+if __name__ == "__main__":
+    run_forever()
@@ -3,7 +3,7 @@ import { X, Terminal, Loader2, KeyRound, CheckCircle, AlertTriangle } from 'luci
 import { motion, AnimatePresence } from 'framer-motion';
 
 interface ScraperStatus {
-  status: 'IDLE' | 'RUNNING' | 'WAITING_FOR_OTP' | 'COMPLETED' | 'ERROR';
+  status: 'IDLE' | 'QUEUED' | 'RUNNING' | 'WAITING_FOR_OTP' | 'COMPLETED' | 'ERROR';
   message: string;
   logs: string[];
 }
@@ -82,6 +82,7 @@ const ScraperStatusModal: React.FC<ModalProps> = ({ isOpen, onClose }) => {
         <div className="flex justify-between items-center p-4 border-b border-white/10 bg-zinc-950">
             <div className="flex items-center gap-2">
                 <div className={`w-2.5 h-2.5 rounded-full ${
+                    scraperState.status === 'QUEUED' ? 'bg-zinc-400 animate-pulse' :
                     scraperState.status === 'RUNNING' ? 'bg-blue-500 animate-pulse' :
                     scraperState.status === 'WAITING_FOR_OTP' ? 'bg-amber-500 animate-pulse' :
                     scraperState.status === 'COMPLETED' ? 'bg-green-500' :
@@ -137,6 +138,7 @@ const ScraperStatusModal: React.FC<ModalProps> = ({ isOpen, onClose }) => {
             ) : (
                 <div className="flex items-center justify-between text-zinc-400 text-sm">
                     <div className="flex items-center gap-2">
+                        {scraperState.status === 'QUEUED' && <Loader2 className="w-4 h-4 animate-spin text-zinc-400" />}
                         {scraperState.status === 'RUNNING' && <Loader2 className="w-4 h-4 animate-spin text-blue-500" />}
                         {scraperState.status === 'COMPLETED' && <CheckCircle className="w-4 h-4 text-green-500" />}
                         <span>{scraperState.message}</span>
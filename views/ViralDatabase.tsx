@@ -42,7 +42,13 @@ const ViralDatabase: React.FC = () => {
     setScraping(true);
     setShowScraperModal(true); // <--- OPEN MODAL IMMEDIATELY
     try {
-      await fetch('http://localhost:8000/trigger-scrape', { method: 'POST' });
+      const res = await fetch('http://localhost:8000/trigger-scrape', { method: 'POST' });
+      const data = await res.json();
+      if (data.status === 'already_running') {
+        // A harvest is already queued/running: keep the modal open so it shows that run
+        setScraping(false);
+        return;
+      }
     } catch (err) {
       alert("Failed to start scraper.");
       setScraping(false);